@@ -7,6 +7,7 @@ import tkinter as tk
 from tkinter import ttk, filedialog, scrolledtext, messagebox
 import os
 import sys
+import base64
 import threading
 import zipfile
 import shutil
@@ -14,47 +15,150 @@ import tempfile
 import subprocess
 import queue
 import re
+import mmap
+import collections
+import json
+import codecs
+import atexit
+import time
 from pathlib import Path
-from typing import Optional
-
-import tkinter as tk
-from tkinter import ttk, filedialog, scrolledtext, messagebox
-import os
-import sys
-import threading
-import zipfile
-import shutil
-import tempfile
-import subprocess
-import queue
-import re
-from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 VERSION = "3.1.0"
 CONFIG_FILE = os.path.expanduser("~/.zimpacker_config.txt")
+CACHE_FILE = os.path.expanduser("~/.zimpacker_cache.json")
+COPY_BUFFER_SIZE = 1 << 20  # 1 MiB
+EXTRACT_WORKERS = min(16, (os.cpu_count() or 1) * 2)
+PARALLEL_EXTRACT_MIN = 16  # smaller archives are extracted serially
+OUTPUT_TAIL_LINES = 20
+OUTPUT_CHUNK_SIZE = 64 << 10  # zimwriterfs output is read 64 KiB at a time
+LOG_FLUSH_MS = 50  # redraw the console at most 20 times a second
+MAX_LOG_LINES = 5000  # older console lines are dropped
+MAX_LOGS_PER_DRAIN = 2000  # console lines inserted per drain at most
+RAM_DISK_DIR = "/dev/shm"
+RAM_DISK_HEADROOM = 64 << 20  # keep 64 MiB free in the RAM disk
+RAM_DISK_MEMORY_RESERVE = 512 << 20  # memory left for zimwriterfs and the system
+STALE_TEMP_AGE = 24 * 60 * 60  # seconds before a leftover temp dir is removed
+SHUTDOWN_WAIT = 5  # seconds the exit hook waits for a conversion to stop
+HTML_SUFFIXES = frozenset(('.html', '.htm'))  # compared lower-cased
+
+# Actual 48x48 transparent PNG, decoded once at import
+ILLUSTRATION_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAADAAAAAwCAYAAABXAvmHAAAAEElEQVR42u3BAQ0AAADCoPdPbQ8HFAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAB8GQgAAAFR6jJSAAAAAElFTkSuQmCC"
+)
 
 current_zip_path: Optional[str] = None
-conversion_thread: Optional[threading.Thread] = None
-status_queue = queue.Queue()
-is_converting = False
+conversion_jobs = queue.SimpleQueue()
+conversion_busy = threading.Event()
+_conversion_worker: Optional[threading.Thread] = None
+status_queue = queue.SimpleQueue()
+# Log lines wait here for the GUI; a flood only keeps what the console can show
+pending_logs = collections.deque(maxlen=MAX_LOG_LINES)
+status_listener: Optional[Callable[[], None]] = None
+
+_drain_requested = threading.Event()
+_zimwriterfs_verified: Optional[tuple] = None  # (path, mtime) of the last good check
+_zimwriterfs_lock = threading.Lock()
+_active_temp_dirs = set()
+_shutting_down = threading.Event()
+
+
+def _wake_gui():
+    """Wake the GUI unless a drain is already pending"""
+    if status_listener is not None and not _drain_requested.is_set():
+        _drain_requested.set()
+        status_listener()
+
+
+def post_status(*item):
+    """Queue a message for the GUI"""
+    status_queue.put(item)
+    _wake_gui()
 
 
 def log(msg, tag="INFO"):
     """Thread-safe logging"""
-    status_queue.put(("log", f"[{tag}] {msg}"))
+    pending_logs.append((f"[{tag}] {msg}", tag))
+    _wake_gui()
+
+
+def log_many(msgs, tag="INFO"):
+    """Thread-safe logging of several lines with a single wake-up"""
+    pending_logs.extend((f"[{tag}] {msg}", tag) for msg in msgs)
+    _wake_gui()
 
 
 def update_status(msg):
     """Update status label"""
-    status_queue.put(("status", msg))
+    post_status("status", msg)
 
 
 def verify_zimwriterfs():
-    """Verify zimwriterfs is available"""
+    """
+    Verify zimwriterfs is available.
+    A successful check is remembered, in memory and in CACHE_FILE across
+    runs, until the binary on PATH changes (path or mtime), so upgrading
+    zim-tools is re-verified; failures are re-checked so installing
+    zim-tools doesn't need a restart.
+    """
+    global _zimwriterfs_verified
+
+    path = shutil.which("zimwriterfs")
+    if path is None:
+        # Fail fast instead of spawning a process that can't exist
+        log("zimwriterfs not found in PATH!", "ERROR")
+        log("Install with: sudo apt install zim-tools", "ERROR")
+        return False
+
+    try:
+        key = (path, os.path.getmtime(path))
+    except OSError:
+        key = None
+
+    with _zimwriterfs_lock:
+        if key is not None and key == _zimwriterfs_verified:
+            return True
+        if key is not None and _load_verified_zimwriterfs(key):
+            _zimwriterfs_verified = key
+            return True
+        version = _check_zimwriterfs(path)
+        ok = version is not None
+        _zimwriterfs_verified = key if ok else None
+        if ok and key is not None:
+            _save_verified_zimwriterfs(key, version)
+        return ok
+
+
+def _load_verified_zimwriterfs(key):
+    """Return True if CACHE_FILE records a good check of this (path, mtime)"""
+    try:
+        with open(CACHE_FILE, encoding="utf-8") as f:
+            cached = json.load(f)["zimwriterfs"]
+        if (cached["path"], cached["mtime"]) != key:
+            return False
+    except (OSError, ValueError, KeyError, TypeError):
+        return False
+    log(f"Found zimwriterfs: {cached.get('version', cached['path'])} (cached)", "OK")
+    return True
+
+
+def _save_verified_zimwriterfs(key, version):
+    """Record a good check in CACHE_FILE; failing to write it is harmless"""
+    path, mtime = key
+    try:
+        with open(CACHE_FILE, "w", encoding="utf-8") as f:
+            json.dump({"zimwriterfs": {"path": path, "mtime": mtime,
+                                       "version": version}}, f)
+    except OSError:
+        pass
+
+
+def _check_zimwriterfs(path):
+    """Run zimwriterfs --version; returns the version, or None if it failed"""
     try:
         result = subprocess.run(
-            ["zimwriterfs", "--version"],
+            [path, "--version"],
             capture_output=True,
             text=True,
             timeout=5
@@ -62,25 +166,202 @@ def verify_zimwriterfs():
         if result.returncode == 0:
             version = result.stdout.strip()
             log(f"Found zimwriterfs: {version}", "OK")
-            return True
+            return version
         else:
             log("zimwriterfs verification failed", "ERROR")
-            return False
+            return None
     except FileNotFoundError:
         log("zimwriterfs not found in PATH!", "ERROR")
         log("Install with: sudo apt install zim-tools", "ERROR")
-        return False
+        return None
     except Exception as e:
         log(f"Error verifying zimwriterfs: {e}", "ERROR")
-        return False
+        return None
+
 
+def _member_path(filename):
+    """
+    Normalise a ZIP member name to a safe relative path.
+    Backslashes count as separators; absolute prefixes, '.' and '..' are
+    dropped. Returns None if nothing is left.
+    """
+    parts = [p for p in filename.replace('\\', '/').split('/')
+             if p not in ('', '.', '..')]
+    if not parts:
+        return None
+    return os.path.join(*parts)
+
+
+def _member_target(extract_dir, filename):
+    """
+    Map a ZIP member name to a path inside extract_dir.
+    Returns None for names that would escape the directory.
+    """
+    rel_path = _member_path(filename)
+    if rel_path is None:
+        return None
+    return os.path.join(extract_dir, rel_path)
 
-def extract_zip(zip_path, extract_dir):
-    """Extract ZIP file to directory"""
+
+def _plan_extraction(entries, extract_dir):
+    """
+    Create every directory the archive needs and return (info, target)
+    pairs for the file entries. Doing the directories up front keeps the
+    extraction workers from racing on makedirs.
+    When several entries map to the same target only the last one is kept,
+    as extractall would leave it, so no two workers write the same file.
+    """
+    dirs = set()
+    jobs = {}
+    for info in entries:
+        target = _member_target(extract_dir, info.filename)
+        if target is None:
+            log(f"Skipping unsafe entry: {info.filename}", "WARN")
+        elif info.is_dir():
+            dirs.add(target)
+        else:
+            dirs.add(os.path.dirname(target))
+            jobs.pop(target, None)
+            jobs[target] = info
+
+    for directory in dirs:
+        os.makedirs(directory, exist_ok=True)
+    return [(info, target) for target, info in jobs.items()]
+
+
+def _stop_if_shutting_down():
+    """Abort the running conversion once the exit hook has started"""
+    if _shutting_down.is_set():
+        raise RuntimeError("Conversion stopped: the application is closing")
+
+
+def _extract_file(zip_ref, info, target, view, on_html):
+    """
+    Extract one file entry, streaming it through the caller's buffer.
+    Returns on_html's result for HTML files, False otherwise.
+    """
+    _stop_if_shutting_down()
+    with zip_ref.open(info) as src, \
+            open(target, 'wb', buffering=COPY_BUFFER_SIZE) as dst:
+        while True:
+            n = src.readinto(view)
+            if not n:
+                break
+            dst.write(view[:n])
+
+    # Keep owner read/write so the rewrite pass and cleanup still work
+    mode = (info.external_attr >> 16) & 0o777
+    if mode:
+        os.chmod(target, mode | 0o600)
+
+    if on_html is not None and os.path.splitext(target)[1].lower() in HTML_SUFFIXES:
+        return bool(on_html(target))
+    return False
+
+
+def extract_zip(zip_ref, extract_dir, on_html=None):
+    """
+    Extract an open ZipFile to directory.
+    Entries are decompressed in parallel; each worker thread keeps its own
+    ZipFile handle (a shared handle is not thread-safe) and its own 1 MiB
+    copy buffer. Small archives are extracted serially on zip_ref itself.
+
+    If on_html is given it is called with the path of every HTML file right
+    after that file is written, on the same worker, so post-processing
+    overlaps with extraction. Returns how many of those calls returned True.
+    """
+    zip_path = zip_ref.filename
     log(f"Extracting: {os.path.basename(zip_path)}")
-    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-        zip_ref.extractall(extract_dir)
+    jobs = _plan_extraction(zip_ref.infolist(), extract_dir)
+
+    if len(jobs) < PARALLEL_EXTRACT_MIN:
+        view = memoryview(bytearray(COPY_BUFFER_SIZE))
+        handled = sum(_extract_file(zip_ref, info, target, view, on_html)
+                      for info, target in jobs)
+        log(f"Extracted to: {extract_dir}")
+        return handled
+
+    local = threading.local()
+    handles = []
+    handles_lock = threading.Lock()
+
+    def extract_one(info, target):
+        worker_zip = getattr(local, "zip_ref", None)
+        if worker_zip is None:
+            worker_zip = local.zip_ref = zipfile.ZipFile(zip_path, 'r')
+            local.view = memoryview(bytearray(COPY_BUFFER_SIZE))
+            with handles_lock:
+                handles.append(worker_zip)
+        return _extract_file(worker_zip, info, target, local.view, on_html)
+
+    handled = 0
+    try:
+        with ThreadPoolExecutor(max_workers=EXTRACT_WORKERS) as executor:
+            futures = [executor.submit(extract_one, info, target)
+                       for info, target in jobs]
+            try:
+                for future in as_completed(futures):
+                    handled += future.result()
+            except BaseException:
+                # Stop queued entries instead of finishing a doomed extraction
+                for future in futures:
+                    future.cancel()
+                raise
+    finally:
+        for worker_zip in handles:
+            worker_zip.close()
+
     log(f"Extracted to: {extract_dir}")
+    return handled
+
+
+def _available_memory() -> Optional[int]:
+    """Memory that can be used without swapping, in bytes, or None if unknown"""
+    try:
+        with open("/proc/meminfo", "rb") as f:
+            for line in f:
+                if line.startswith(b"MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def pick_temp_parent(entries, use_ram_disk):
+    """
+    Choose where to create the extraction directory.
+    Returns RAM_DISK_DIR if requested and the extracted site fits both in
+    the tmpfs and in available memory, otherwise None (the system temp
+    directory). A tmpfs size is only a limit, not reserved memory.
+    """
+    if not use_ram_disk:
+        return None
+
+    if not os.path.isdir(RAM_DISK_DIR):
+        log(f"{RAM_DISK_DIR} not available, extracting to disk", "WARN")
+        return None
+
+    needed = sum(info.file_size for info in entries)
+
+    free = shutil.disk_usage(RAM_DISK_DIR).free
+    if needed + RAM_DISK_HEADROOM > free:
+        log(f"Not enough space in {RAM_DISK_DIR} "
+            f"({needed >> 20} MiB needed, {free >> 20} MiB free), extracting to disk", "WARN")
+        return None
+
+    available = _available_memory()
+    if available is None or needed + RAM_DISK_MEMORY_RESERVE > available:
+        log(f"Not enough free memory for {RAM_DISK_DIR} "
+            f"({needed >> 20} MiB needed, "
+            f"{'unknown' if available is None else f'{available >> 20} MiB'} available), "
+            "extracting to disk", "WARN")
+        return None
+
+    log(f"Extracting to RAM disk: {RAM_DISK_DIR}")
+    return RAM_DISK_DIR
 
 
 def detect_site_root(extract_dir):
@@ -99,43 +380,140 @@ def detect_site_root(extract_dir):
     return extract_dir
 
 
-def find_index_html(root_dir):
+def find_index_in_zip(entries) -> Optional[str]:
     """
-    Find index.html in the site root.
-    Returns (absolute_path, relative_path_from_root)
+    Find index.html in the ZIP central directory entries, before extraction.
+    Member names are normalised the same way extraction does, so the result
+    is the page's path relative to the extraction directory.
+    Returns the least deeply nested match, or None.
     """
-    # First check root
-    root_index = os.path.join(root_dir, "index.html")
-    if os.path.exists(root_index):
-        log("Found index.html at root")
-        return root_index, "index.html"
+    candidates = []
+    for info in entries:
+        if info.is_dir():
+            continue
+        rel_path = _member_path(info.filename)
+        if rel_path and os.path.basename(rel_path) == "index.html":
+            candidates.append(rel_path)
+    if not candidates:
+        return None
 
-    # Search recursively
-    log("Searching for index.html recursively...")
-    for dirpath, dirnames, filenames in os.walk(root_dir):
-        if "index.html" in filenames:
-            abs_path = os.path.join(dirpath, "index.html")
-            rel_path = os.path.relpath(abs_path, root_dir)
-            log(f"Found index.html at: {rel_path}")
-            return abs_path, rel_path
+    index_path = min(candidates, key=lambda path: (path.count(os.sep), len(path)))
+    log(f"Found index.html at: {index_path}")
+    return index_path
 
-    return None, None
 
+# One pass over the HTML for both rewrites: file:/// URLs are dropped,
+# href="/... and src="/... lose their leading slash.
+# Works on raw bytes so pages never go through a decode/encode round-trip.
+_LINK_PATTERNS = (rb'file:///[^\s\'"]*', rb'(href|src)=["\']/')
+_LINK_RE = re.compile(b'|'.join(_LINK_PATTERNS))
+_FILE_URL_RE = re.compile(_LINK_PATTERNS[0])
+_ABS_LINK_RE = re.compile(_LINK_PATTERNS[1])
 
-def rewrite_html_links(html_path):
-    """Rewrite links in HTML file to be relative"""
-    try:
-        with open(html_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
 
-        # Remove file:/// protocols
-        content = re.sub(r'file:///[^\s\'"]*', '', content)
+def _link_replacement(match):
+    # Only the href/src alternative has a capture group
+    return match.group(1) + b'="' if match.lastindex else b''
+
+
+def _link_spans(data, pattern):
+    """Return (start, end, replacement) for every link rewrite, in order"""
+    return [(m.start(), m.end(), _link_replacement(m))
+            for m in pattern.finditer(data)]
+
+
+def _link_pattern(data):
+    """
+    Cheap literal prescan that picks the narrowest pattern for the markers
+    present. None means no link rewrite can apply.
+    bytes/mmap.find are memchr/memmem based and much faster than the regex.
+    """
+    has_file = data.find(b'file:///') >= 0
+    has_abs = data.find(b'="/') >= 0 or data.find(b"='/") >= 0
+    if has_file and has_abs:
+        return _LINK_RE
+    if has_file:
+        return _FILE_URL_RE
+    if has_abs:
+        return _ABS_LINK_RE
+    return None
+
+
+def _compact_links(mm):
+    """
+    Apply the link rewrites to a writable mmap in place.
+    Every replacement is no longer than its match, so the text between
+    matches only ever moves left. Returns the new length, or None if
+    nothing matched.
+    """
+    pattern = _link_pattern(mm)
+    if pattern is None:
+        return None
+
+    read_pos = 0
+    write_pos = 0
+    for start, end, replacement in _link_spans(mm, pattern):
+        gap = start - read_pos
+        if gap and write_pos != read_pos:
+            mm.move(write_pos, read_pos, gap)
+        write_pos += gap
 
-        # Convert absolute paths to relative
-        content = re.sub(r'(href|src)=["\']/', r'\1="', content)
+        mm[write_pos:write_pos + len(replacement)] = replacement
+        write_pos += len(replacement)
+        read_pos = end
 
-        with open(html_path, 'w', encoding='utf-8', errors='ignore') as f:
-            f.write(content)
+    if read_pos == 0:
+        return None
+
+    tail = len(mm) - read_pos
+    if tail and write_pos != read_pos:
+        mm.move(write_pos, read_pos, tail)
+    return write_pos + tail
+
+
+def _rewrite_links_buffered(f):
+    """Read/modify/write fallback for files that cannot be mapped"""
+    content = f.read()
+    pattern = _link_pattern(content)
+    if pattern is None:
+        return
+
+    new_content = pattern.sub(_link_replacement, content)
+    # Every rewrite shortens the page, so equal length means no change
+    if len(new_content) == len(content):
+        return
+
+    f.seek(0)
+    f.write(new_content)
+    f.truncate()
+
+
+def rewrite_html_links(html_path):
+    """
+    Rewrite links in HTML file to be relative.
+    The file is edited in place through mmap and truncated once at the end.
+    """
+    try:
+        # Raw fd: the mmap path never needs Python's buffered file object
+        fd = os.open(html_path, os.O_RDWR | getattr(os, "O_BINARY", 0))
+        try:
+            try:
+                mm = mmap.mmap(fd, 0)
+            except ValueError:
+                # Empty file, nothing to rewrite
+                return True
+            except OSError:
+                # Filesystem without mmap support
+                with open(fd, 'r+b', closefd=False) as f:
+                    _rewrite_links_buffered(f)
+                return True
+
+            with mm:
+                new_len = _compact_links(mm)
+            if new_len is not None:
+                os.ftruncate(fd, new_len)
+        finally:
+            os.close(fd)
 
         return True
     except Exception as e:
@@ -143,38 +521,48 @@ def rewrite_html_links(html_path):
         return False
 
 
-def rewrite_all_html_files(root_dir):
-    """Rewrite all HTML files in the site"""
-    log("Rewriting HTML links...")
-    count = 0
-    for dirpath, dirnames, filenames in os.walk(root_dir):
-        for filename in filenames:
-            if filename.lower().endswith('.html'):
-                html_path = os.path.join(dirpath, filename)
-                if rewrite_html_links(html_path):
-                    count += 1
-    log(f"Rewrote {count} HTML files")
+_SAFE_NAME_RE = re.compile(r'[^a-zA-Z0-9_]')
+
+
+# Only real line breaks end a line; str.splitlines would also split on
+# form feeds and other separators
+_LINE_BREAK_RE = re.compile(r'\r\n|\r|\n')
+
+
+def _pump_output(stream, tail):
+    """Forward zimwriterfs output to the log a chunk at a time"""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    partial = ""
+    while True:
+        chunk = stream.read1(OUTPUT_CHUNK_SIZE)
+        text = partial + decoder.decode(chunk, final=not chunk)
+        lines = _LINE_BREAK_RE.split(text)
+        # The last piece is unterminated; carry it over to the next chunk
+        partial = lines.pop() if chunk else ""
+        lines = [line.rstrip() for line in lines]
+        lines = [line for line in lines if line]
+        if lines:
+            log_many(lines)
+            tail.extend(lines)
+        if not chunk:
+            break
 
 
 def run_zimwriterfs(site_root, output_zim, welcome_path, title, description, language):
     """
     Run zimwriterfs to create ZIM file.
+    Output is streamed to the log in chunks; the last lines are kept
+    for the error dialog.
     Returns (success, stdout, stderr)
     
     Mandatory args: welcome, illustration, language, name, title, description, creator, publisher
     """
-    import base64
-    
     # Generate safe name from title
-    safe_name = re.sub(r'[^a-zA-Z0-9_]', '_', title).lower()
-    
-    # Actual 48x48 transparent PNG
-    png_48x48_b64 = "iVBORw0KGgoAAAANSUhEUgAAADAAAAAwCAYAAABXAvmHAAAAEElEQVR42u3BAQ0AAADCoPdPbQ8HFAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAB8GQgAAAFR6jJSAAAAAElFTkSuQmCC"
+    safe_name = _SAFE_NAME_RE.sub('_', title).lower()
     
     illustration_path = os.path.join(site_root, "zimpacker_illustration.png")
     
-    with open(illustration_path, 'wb') as f:
-        f.write(base64.b64decode(png_48x48_b64))
+    Path(illustration_path).write_bytes(ILLUSTRATION_PNG)
     
     illustration_rel = "zimpacker_illustration.png"
     log(f"Created illustration: {illustration_rel}")
@@ -198,97 +586,199 @@ def run_zimwriterfs(site_root, output_zim, welcome_path, title, description, lan
     log(f"Running: {' '.join(cmd)}")
 
     try:
-        result = subprocess.run(
+        proc = subprocess.Popen(
             cmd,
-            capture_output=True,
-            text=True,
-            timeout=600  # 10 minute timeout
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT
         )
+        tail = collections.deque(maxlen=OUTPUT_TAIL_LINES)
+        reader = threading.Thread(target=_pump_output, args=(proc.stdout, tail),
+                                  daemon=True)
+        reader.start()
 
-        if result.returncode == 0:
+        try:
+            returncode = proc.wait(timeout=600)  # 10 minute timeout
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+            reader.join()
+            log("ZIM creation timed out!", "ERROR")
+            return False, "", "Process timed out after 10 minutes"
+
+        reader.join()
+        output = "\n".join(tail)
+
+        if returncode == 0:
             log("ZIM creation successful!", "SUCCESS")
-            return True, result.stdout, result.stderr
+            return True, output, ""
         else:
-            log(f"ZIM creation failed (exit code {result.returncode})", "ERROR")
-            if result.stderr:
-                log(f"STDERR: {result.stderr}", "ERROR")
-            return False, result.stdout, result.stderr
-
-    except subprocess.TimeoutExpired:
-        log("ZIM creation timed out!", "ERROR")
-        return False, "", "Process timed out after 10 minutes"
+            log(f"ZIM creation failed (exit code {returncode})", "ERROR")
+            return False, "", output
+
     except Exception as e:
         log(f"ZIM creation error: {e}", "ERROR")
         return False, "", str(e)
 
 
-def convert_zip_to_zim(zip_path, output_zim, title, description, language, rewrite_links):
-    """Main conversion pipeline"""
-    global is_converting
+def _remove_path(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    else:
+        os.unlink(path)
+
+
+def remove_tree(path):
+    """
+    Delete a directory tree.
+    Independent subtrees are removed in parallel, descending through
+    single-folder wrappers (the usual site/ layout) to find them.
+    """
+    units = [path]
+    while len(units) == 1 and os.path.isdir(units[0]) and not os.path.islink(units[0]):
+        with os.scandir(units[0]) as it:
+            units = [entry.path for entry in it]
 
+    if len(units) > 1:
+        with ThreadPoolExecutor(max_workers=EXTRACT_WORKERS) as executor:
+            list(executor.map(_remove_path, units))
+
+    shutil.rmtree(path)
+
+
+def _cleanup_temp_dirs():
+    """
+    atexit hook: remove temp dirs of conversions cut short by closing the
+    app, and stale zimpacker_* dirs left behind by earlier crashed runs.
+    The conversion worker is a daemon thread still running at this point,
+    so it is told to stop first and given SHUTDOWN_WAIT seconds to finish
+    its current entry and clean up after itself. Anything it writes after
+    that (e.g. a file it was already extracting) is left for the stale
+    sweep of a later run.
+    """
+    _shutting_down.set()
+    deadline = time.monotonic() + SHUTDOWN_WAIT
+    while conversion_busy.is_set() and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    for temp_dir in list(_active_temp_dirs):
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    cutoff = time.time() - STALE_TEMP_AGE
+    for parent in (tempfile.gettempdir(), RAM_DISK_DIR):
+        try:
+            with os.scandir(parent) as it:
+                stale = [entry.path for entry in it
+                         if entry.name.startswith("zimpacker_")
+                         and entry.is_dir(follow_symlinks=False)
+                         and entry.stat(follow_symlinks=False).st_mtime < cutoff]
+        except OSError:
+            continue
+        for temp_dir in stale:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+atexit.register(_cleanup_temp_dirs)
+
+
+def convert_zip_to_zim(zip_path, output_zim, title, description, language, rewrite_links,
+                       use_ram_disk=False):
+    """Main conversion pipeline"""
     temp_dir = None
     try:
-        is_converting = True
         update_status("Converting...")
 
         # Verify zimwriterfs
         log("Verifying zimwriterfs installation...")
         if not verify_zimwriterfs():
-            status_queue.put(("error", "zimwriterfs not found!\n\nInstall with:\nsudo apt install zim-tools"))
+            post_status("error", "zimwriterfs not found!\n\nInstall with:\nsudo apt install zim-tools")
             return False
 
-        # Create temp directory
-        temp_dir = tempfile.mkdtemp(prefix="zimpacker_")
-        log(f"Created temp directory: {temp_dir}")
-
-        # Extract ZIP
-        extract_zip(zip_path, temp_dir)
+        # The central directory is read once and drives index lookup,
+        # RAM disk sizing and extraction
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            entries = zip_ref.infolist()
+
+            # Find index.html before spending time on extraction
+            index_path = find_index_in_zip(entries)
+            if not index_path:
+                log("ERROR: No index.html found in ZIP!", "ERROR")
+                post_status("error", "No index.html found in the ZIP file!")
+                return False
+
+            # Create temp directory
+            temp_dir = tempfile.mkdtemp(prefix="zimpacker_",
+                                        dir=pick_temp_parent(entries, use_ram_disk))
+            _active_temp_dirs.add(temp_dir)
+            log(f"Created temp directory: {temp_dir}")
+
+            # Extract ZIP, rewriting each HTML page as soon as it is written
+            if rewrite_links:
+                log("Rewriting HTML links during extraction...")
+                rewritten = extract_zip(zip_ref, temp_dir, on_html=rewrite_html_links)
+                log(f"Rewrote {rewritten} HTML files")
+            else:
+                extract_zip(zip_ref, temp_dir)
 
         # Detect site root
         site_root = detect_site_root(temp_dir)
 
-        # Find index.html
-        index_abs, index_rel = find_index_html(site_root)
-        if not index_abs:
-            log("ERROR: No index.html found in ZIP!", "ERROR")
-            status_queue.put(("error", "No index.html found in the ZIP file!"))
-            return False
-
-        # Rewrite links if enabled
-        if rewrite_links:
-            rewrite_all_html_files(site_root)
+        # Welcome page path relative to the site root
+        index_rel = os.path.relpath(os.path.join(temp_dir, index_path), site_root)
 
         # Run zimwriterfs
+        _stop_if_shutting_down()
         update_status("Creating ZIM file...")
         success, stdout, stderr = run_zimwriterfs(
             site_root, output_zim, index_rel, title, description, language
         )
 
         if not success:
-            status_queue.put(("error", f"zimwriterfs failed:\n\n{stderr}"))
+            post_status("error", f"zimwriterfs failed:\n\n{stderr}")
             return False
 
         # Success
         log(f"ZIM file created: {output_zim}", "SUCCESS")
         update_status("Complete!")
-        status_queue.put(("success", output_zim))
+        post_status("success", output_zim)
         return True
 
     except Exception as e:
         log(f"Conversion error: {e}", "ERROR")
-        status_queue.put(("error", str(e)))
+        post_status("error", str(e))
         return False
 
     finally:
-        # Cleanup temp directory
-        if temp_dir and os.path.exists(temp_dir):
+        # Cleanup temp directory; it stays tracked if this fails so the
+        # exit hook can retry
+        if temp_dir:
             try:
-                shutil.rmtree(temp_dir)
-                log("Cleaned up temp directory")
+                if os.path.exists(temp_dir):
+                    remove_tree(temp_dir)
+                    log("Cleaned up temp directory")
+                _active_temp_dirs.discard(temp_dir)
             except Exception as e:
                 log(f"Failed to cleanup temp: {e}", "WARN")
 
-        is_converting = False
+
+def _conversion_loop():
+    """Run queued conversions one after another on a single long-lived thread"""
+    while True:
+        args = conversion_jobs.get()
+        try:
+            convert_zip_to_zim(*args)
+        finally:
+            conversion_busy.clear()
+
+
+def submit_conversion(*args):
+    """Queue a conversion, starting the worker thread on first use"""
+    global _conversion_worker
+
+    conversion_busy.set()
+    if _conversion_worker is None:
+        _conversion_worker = threading.Thread(target=_conversion_loop, daemon=True)
+        _conversion_worker.start()
+    conversion_jobs.put(args)
 
 
 class ZimPackerGUI:
@@ -305,12 +795,22 @@ class ZimPackerGUI:
         self.language_var = tk.StringVar(value="eng")
         self.description_var = tk.StringVar()
         self.rewrite_var = tk.BooleanVar(value=True)
+        self.ram_disk_var = tk.BooleanVar(value=os.path.isdir(RAM_DISK_DIR))
 
+        self.setup_styles()
         self.setup_ui()
         self.start_queue_processor()
 
-        # Verify zimwriterfs on startup
-        threading.Thread(target=verify_zimwriterfs, daemon=True).start()
+    def setup_styles(self):
+        """Configure shared ttk styles once; widgets and state changes refer to them by name"""
+        style = ttk.Style(self.root)
+        style.configure("Title.TLabel", font=("Arial", 16, "bold"))
+        style.configure("Subtitle.TLabel", foreground="gray")
+        style.configure("Credit.TLabel", foreground="gray", font=("Arial", 8))
+        style.configure("Section.TLabel", font=("Arial", 10, "bold"))
+        style.configure("Status.TLabel", foreground="blue", font=("Arial", 10))
+        style.configure("Success.Status.TLabel", foreground="green")
+        style.configure("Error.Status.TLabel", foreground="red")
 
     def setup_ui(self):
         """Setup the GUI layout"""
@@ -326,13 +826,13 @@ class ZimPackerGUI:
 
         # Title
         title_label = ttk.Label(main_frame, text=f"Invader ZIM {VERSION}",
-                                font=("Arial", 16, "bold"))
+                                style="Title.TLabel")
         title_label.grid(row=row, column=0, columnspan=3, pady=(0, 5))
         row += 1
 
         subtitle_label = ttk.Label(main_frame,
                                    text="Convert website ZIPs to ZIM format",
-                                   foreground="gray")
+                                   style="Subtitle.TLabel")
         subtitle_label.grid(row=row, column=0, columnspan=3, pady=(0, 15))
         row += 1
 
@@ -343,7 +843,7 @@ class ZimPackerGUI:
 
         # ZIP Input
         ttk.Label(main_frame, text="Input ZIP File:",
-                  font=("Arial", 10, "bold")).grid(row=row, column=0, sticky=tk.W, pady=5)
+                  style="Section.TLabel").grid(row=row, column=0, sticky=tk.W, pady=5)
         row += 1
 
         ttk.Entry(main_frame, textvariable=self.zip_path, width=60).grid(
@@ -354,7 +854,7 @@ class ZimPackerGUI:
 
         # Metadata section
         ttk.Label(main_frame, text="Metadata:",
-                  font=("Arial", 10, "bold")).grid(row=row, column=0, sticky=tk.W, pady=(15, 5))
+                  style="Section.TLabel").grid(row=row, column=0, sticky=tk.W, pady=(15, 5))
         row += 1
 
         # Title
@@ -377,7 +877,7 @@ class ZimPackerGUI:
 
         # Options
         ttk.Label(main_frame, text="Options:",
-                  font=("Arial", 10, "bold")).grid(row=row, column=0, sticky=tk.W, pady=(15, 5))
+                  style="Section.TLabel").grid(row=row, column=0, sticky=tk.W, pady=(15, 5))
         row += 1
 
         ttk.Checkbutton(main_frame, text="Rewrite HTML links (remove file:// and absolute paths)",
@@ -385,9 +885,14 @@ class ZimPackerGUI:
             row=row, column=0, columnspan=3, sticky=tk.W)
         row += 1
 
+        ttk.Checkbutton(main_frame, text="Use RAM disk for extraction (/dev/shm, if the site fits)",
+                        variable=self.ram_disk_var).grid(
+            row=row, column=0, columnspan=3, sticky=tk.W)
+        row += 1
+
         # Output
         ttk.Label(main_frame, text="Output ZIM File:",
-                  font=("Arial", 10, "bold")).grid(row=row, column=0, sticky=tk.W, pady=(15, 5))
+                  style="Section.TLabel").grid(row=row, column=0, sticky=tk.W, pady=(15, 5))
         row += 1
 
         ttk.Entry(main_frame, textvariable=self.output_path, width=60).grid(
@@ -403,8 +908,7 @@ class ZimPackerGUI:
         row += 1
 
         # Status
-        self.status_label = ttk.Label(main_frame, text="Ready",
-                                      foreground="blue", font=("Arial", 10))
+        self.status_label = ttk.Label(main_frame, text="Ready", style="Status.TLabel")
         self.status_label.grid(row=row, column=0, columnspan=3, pady=5)
         row += 1
 
@@ -415,7 +919,7 @@ class ZimPackerGUI:
 
         # Log area
         ttk.Label(main_frame, text="Console Log:",
-                  font=("Arial", 10, "bold")).grid(row=row, column=0, sticky=tk.W, pady=(10, 5))
+                  style="Section.TLabel").grid(row=row, column=0, sticky=tk.W, pady=(10, 5))
         row += 1
 
         self.log_text = scrolledtext.ScrolledText(main_frame, height=15,
@@ -432,14 +936,24 @@ class ZimPackerGUI:
         
         # Credit at bottom left
         row += 1
-        credit_label = ttk.Label(main_frame, text="created by github.com/noosed", 
-                                foreground="gray", font=("Arial", 8))
+        credit_label = ttk.Label(main_frame, text="created by github.com/noosed",
+                                 style="Credit.TLabel")
         credit_label.grid(row=row, column=0, sticky=tk.W, pady=(5, 0))
 
+    def dialog_dir(self, path=None):
+        """Start dialogs next to the given (or current) file instead of the cwd"""
+        path = path or current_zip_path
+        if path:
+            folder = os.path.dirname(path)
+            if os.path.isdir(folder):
+                return folder
+        return os.path.expanduser("~")
+
     def browse_zip(self):
         """Open file dialog to select ZIP"""
         filepath = filedialog.askopenfilename(
             title="Select ZIP file",
+            initialdir=self.dialog_dir(),
             filetypes=[("ZIP files", "*.zip"), ("All files", "*.*")]
         )
 
@@ -450,6 +964,7 @@ class ZimPackerGUI:
         """Open file dialog to select output ZIM"""
         filepath = filedialog.asksaveasfilename(
             title="Save ZIM file as",
+            initialdir=self.dialog_dir(self.output_path.get()),
             defaultextension=".zim",
             filetypes=[("ZIM files", "*.zim"), ("All files", "*.*")]
         )
@@ -471,25 +986,21 @@ class ZimPackerGUI:
 
         current_zip_path = filepath
         self.zip_path.set(filepath)
+        zip_file = Path(filepath)
 
         # Auto-populate title from filename
-        basename = os.path.splitext(os.path.basename(filepath))[0]
         if not self.title_var.get():
-            self.title_var.set(basename)
+            self.title_var.set(zip_file.stem)
 
         # Auto-populate output ZIM path
         if not self.output_path.get():
-            output_dir = os.path.dirname(filepath)
-            output_path = os.path.join(output_dir, basename + ".zim")
-            self.output_path.set(output_path)
+            self.output_path.set(str(zip_file.with_suffix(".zim")))
 
-        self.log_message(f"Loaded ZIP: {os.path.basename(filepath)}", "OK")
+        self.log_message(f"Loaded ZIP: {zip_file.name}", "OK")
 
     def start_conversion(self):
         """Start conversion in background thread"""
-        global conversion_thread
-
-        if is_converting:
+        if conversion_busy.is_set():
             self.log_message("Conversion already in progress!", "WARN")
             return
 
@@ -502,6 +1013,7 @@ class ZimPackerGUI:
         description = self.description_var.get()
         language = self.language_var.get()
         rewrite = self.rewrite_var.get()
+        use_ram_disk = self.ram_disk_var.get()
 
         if not output_zim:
             self.log_message("Please specify output ZIM file!", "ERROR")
@@ -511,18 +1023,15 @@ class ZimPackerGUI:
             self.log_message("Please specify a title!", "ERROR")
             return
 
-        # Clear log
+        # Reset status and clear log
+        self.status_label.config(text="Starting...", style="Status.TLabel")
         self.log_text.config(state='normal')
         self.log_text.delete(1.0, tk.END)
         self.log_text.config(state='disabled')
 
-        # Start conversion thread
-        conversion_thread = threading.Thread(
-            target=convert_zip_to_zim,
-            args=(current_zip_path, output_zim, title, description, language, rewrite),
-            daemon=True
-        )
-        conversion_thread.start()
+        # Hand the job to the conversion worker
+        submit_conversion(current_zip_path, output_zim, title, description, language,
+                          rewrite, use_ram_disk)
 
         # Update UI
         self.convert_btn.config(state='disabled')
@@ -530,55 +1039,106 @@ class ZimPackerGUI:
 
     def log_message(self, msg, tag="INFO"):
         """Add message to log"""
+        self.log_messages([(msg, tag)])
+
+    def log_messages(self, entries):
+        """Add several (msg, tag) lines to the log with a single insert"""
+        if not entries:
+            return
+
+        # Text.insert takes alternating chars/tags arguments
+        args = []
+        for msg, tag in entries:
+            args.append(msg + "\n")
+            args.append(tag)
+
         self.log_text.config(state='normal')
-        self.log_text.insert(tk.END, msg + "\n", tag)
+        self.log_text.insert(tk.END, *args)
+
+        # Keep only the newest MAX_LOG_LINES lines
+        line_count = int(self.log_text.index('end-1c').split('.')[0]) - 1
+        if line_count > MAX_LOG_LINES:
+            self.log_text.delete('1.0', f'{line_count - MAX_LOG_LINES + 1}.0')
+
         self.log_text.see(tk.END)
         self.log_text.config(state='disabled')
 
     def start_queue_processor(self):
-        """Start processing status queue"""
-        self.process_queue()
+        """Drain the status queue whenever a worker thread posts to it"""
+        global status_listener
 
-    def process_queue(self):
-        """Process status messages from worker thread"""
-        try:
-            while not status_queue.empty():
-                msg_type, *args = status_queue.get_nowait()
+        self.root.bind("<<StatusUpdate>>", self.schedule_drain)
+        status_listener = self.notify_queue
+        # Pick up anything queued before the main loop started
+        self.root.after_idle(self.process_queue)
 
-                if msg_type == "log":
-                    msg = args[0]
-                    # Extract tag from message
-                    tag = "INFO"
-                    for possible_tag in ["ERROR", "SUCCESS", "WARN", "OK"]:
-                        if f"[{possible_tag}]" in msg:
-                            tag = possible_tag
-                            break
-                    self.log_message(msg, tag)
-
-                elif msg_type == "status":
-                    msg = args[0]
-                    self.status_label.config(text=msg)
-
-                elif msg_type == "success":
-                    output_path = args[0]
-                    self.convert_btn.config(state='normal')
-                    self.progress.stop()
-                    self.status_label.config(text="Complete!", foreground="green")
-                    messagebox.showinfo("Success",
-                                        f"ZIM file created successfully!\n\n{output_path}")
-
-                elif msg_type == "error":
-                    error_msg = args[0]
-                    self.convert_btn.config(state='normal')
-                    self.progress.stop()
-                    self.status_label.config(text="Error!", foreground="red")
-                    messagebox.showerror("Conversion Error", error_msg)
-
-        except queue.Empty:
+    def notify_queue(self):
+        """Called from worker threads; wakes the Tk main loop"""
+        try:
+            self.root.event_generate("<<StatusUpdate>>", when="tail")
+        except (RuntimeError, tk.TclError):
+            # Main loop not running (yet); let the next message try again
+            _drain_requested.clear()
+
+    def schedule_drain(self, event=None):
+        """
+        Coalesce bursts of worker messages into one drain per LOG_FLUSH_MS.
+        Workers don't post another event until process_queue runs.
+        """
+        self.root.after(LOG_FLUSH_MS, self.process_queue)
+
+    def flush_logs(self, limit=MAX_LOG_LINES):
+        """Move up to limit pending log lines into the console"""
+        entries = []
+        try:
+            while len(entries) < limit:
+                entries.append(pending_logs.popleft())
+        except IndexError:
             pass
+        self.log_messages(entries)
 
-        # Schedule next check
-        self.root.after(100, self.process_queue)
+    def process_queue(self, event=None):
+        """Process status messages from worker thread"""
+        _drain_requested.clear()
+        last_status = None
+        while True:
+            try:
+                msg_type, *args = status_queue.get_nowait()
+            except queue.Empty:
+                break
+
+            # Bring the log and status up to date before any dialog pops up
+            if msg_type in ("success", "error"):
+                self.flush_logs()
+                if last_status is not None:
+                    self.status_label.config(text=last_status)
+                    last_status = None
+
+            if msg_type == "status":
+                # Only the latest status of a batch is ever visible
+                last_status = args[0]
+
+            elif msg_type == "success":
+                output_path = args[0]
+                self.convert_btn.config(state='normal')
+                self.progress.stop()
+                self.status_label.config(text="Complete!", style="Success.Status.TLabel")
+                messagebox.showinfo("Success",
+                                    f"ZIM file created successfully!\n\n{output_path}")
+
+            elif msg_type == "error":
+                error_msg = args[0]
+                self.convert_btn.config(state='normal')
+                self.progress.stop()
+                self.status_label.config(text="Error!", style="Error.Status.TLabel")
+                messagebox.showerror("Conversion Error", error_msg)
+
+        self.flush_logs(MAX_LOGS_PER_DRAIN)
+        if pending_logs:
+            # Hit the per-drain cap; let Tk breathe, then continue
+            self.root.after(LOG_FLUSH_MS, self.process_queue)
+        if last_status is not None:
+            self.status_label.config(text=last_status)
 
 
 def main():